@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+# Load-test harness for Transpy - No dependencies!
+#
+# Drives SyncTranslator, the chunker (translate_large_text) and
+# HistoryManager with configurable concurrency against a local mock of the
+# Google Translate endpoint that can inject latency, errors and 429s.
+#
+# Lives outside the package root so Sublime Text does not load it as a plugin.
+#
+# Usage:
+#   python3 tools/transpy_loadtest.py --workload translate --requests 500 --concurrency 16
+#   python3 tools/transpy_loadtest.py --latency-ms 80 --error-rate 0.02 --throttle-rate 0.05
+#   python3 tools/transpy_loadtest.py --workload chunk --profile out/ --tracemalloc
+#
+# The mock runs in a child process (this script with --serve), so it does
+# not share the GIL with the code being measured.
+#
+# --profile DIR writes:
+#   cprofile.prof  - merged cProfile stats of all workers (snakeviz, gprof2dot, flameprof);
+#                    on Python 3.12+ one process-wide profiler covers every worker:
+#                    call counts and own times are exact, callers and cumulative
+#                    times of interleaved threads are approximate
+#   wall.folded    - wall-clock stack samples of the worker threads in collapsed
+#                    format (flamegraph.pl, speedscope, inferno); includes time
+#                    blocked on the network, so it is not a CPU profile
+# --tracemalloc additionally writes (to the --profile dir or the current dir),
+# restricted to allocations made from the transpy_*.py modules:
+#   memory.folded  - allocations still alive after the run, by stack, in bytes
+#   tracemalloc.txt - top allocation growth by line
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import contextlib
+import threading
+import subprocess
+import urllib.parse
+import urllib.request
+import cProfile
+import pstats
+import tracemalloc
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PACKAGE_DIR)
+
+from transpy_sync import SyncTranslator
+from transpy_history import HistoryManager
+
+WORKLOADS = ('translate', 'chunk', 'history')
+
+# Python 3.12+ cProfile is built on sys.monitoring: only one profiler can be
+# active at a time, and it records every thread
+PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+SAMPLE_TEXTS = [
+    "Hello world",
+    "Good morning, how are you today?",
+    "The quick brown fox jumps over the lazy dog.",
+    "Please translate this sentence into another language.",
+    "Sublime Text is a sophisticated text editor for code, markup and prose.",
+]
+
+
+# ----------------------------------------------------------------------
+# Mock translate endpoint
+
+class MockTranslateServer:
+    """Local stand-in for translate.googleapis.com/translate_a/single"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, throttle_rate=0.0,
+                 rate_limit=0, seed=None, port=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit      # Requests per second before 429s, 0 = unlimited
+        self.random = random.Random(seed)
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'throttled': 0}
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._window_count = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        class ThreadingServer(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        self.httpd = ThreadingServer(('127.0.0.1', port), Handler)
+        self.thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}/translate_a/single".format(self.httpd.server_address[1])
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _over_rate_limit(self):
+        if not self.rate_limit:
+            return False
+        now = time.time()
+        if now - self._window_start >= 1.0:
+            self._window_start = now
+            self._window_count = 0
+        self._window_count += 1
+        return self._window_count > self.rate_limit
+
+    def _handle(self, handler):
+        if handler.path.startswith('/__stats'):
+            with self._lock:
+                body = json.dumps(self.stats).encode('utf-8')
+            handler.send_response(200)
+            handler.send_header('Content-Length', str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+            return
+
+        with self._lock:
+            self.stats['requests'] += 1
+            roll = self.random.random()
+            delay = max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms))
+            throttled = self._over_rate_limit() or roll < self.throttle_rate
+            failed = not throttled and roll < self.throttle_rate + self.error_rate
+
+        if delay:
+            time.sleep(delay / 1000.0)
+
+        if throttled:
+            with self._lock:
+                self.stats['throttled'] += 1
+            handler.send_response(429, "Too Many Requests")
+            handler.send_header('Retry-After', '1')
+            handler.end_headers()
+            return
+
+        if failed:
+            with self._lock:
+                self.stats['errors'] += 1
+            handler.send_response(500, "Internal Server Error")
+            handler.end_headers()
+            return
+
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(handler.path).query)
+        text = query.get('q', [''])[0]
+        dest = query.get('tl', ['en'])[0]
+        src = query.get('sl', ['auto'])[0]
+        # Same shape as the real endpoint: [[[translated, original, ...]], None, detected]
+        body = json.dumps([
+            [["[{}] {}".format(dest, text), text, None, None]],
+            None,
+            'en' if src == 'auto' else src
+        ]).encode('utf-8')
+
+        with self._lock:
+            self.stats['ok'] += 1
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json; charset=utf-8')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+class MockServerProcess:
+    """Runs MockTranslateServer in a child process"""
+
+    def __init__(self, args):
+        command = [
+            sys.executable, os.path.abspath(__file__), '--serve',
+            '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+            '--error-rate', str(args.error_rate), '--throttle-rate', str(args.throttle_rate),
+            '--rate-limit', str(args.rate_limit), '--seed', str(args.seed),
+        ]
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, universal_newlines=True)
+        # First line from the child is the URL it listens on
+        self.url = self.process.stdout.readline().strip()
+        if not self.url:
+            raise RuntimeError("Mock server failed to start")
+
+    def fetch_stats(self):
+        stats_url = self.url.replace('/translate_a/single', '/__stats')
+        with urllib.request.urlopen(stats_url, timeout=10) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+        self.process.stdout.close()
+
+
+def serve(args):
+    """Child process entry point for --serve"""
+    server = MockTranslateServer(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, rate_limit=args.rate_limit, seed=args.seed)
+    print(server.url, flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# ----------------------------------------------------------------------
+# Profiling
+
+class SamplingProfiler:
+    """
+    Samples the stacks of worker threads while they run an operation and
+    writes collapsed (folded) stacks. Samples are wall-clock: a thread
+    waiting on a socket is counted just like one burning CPU.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = {}
+        self._thread_ids = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enter(self):
+        """Start sampling the calling thread"""
+        self._thread_ids.add(threading.get_ident())
+
+    def leave(self):
+        self._thread_ids.discard(threading.get_ident())
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        # Stacks are kept as tuples and formatted in write_folded(), so the
+        # loop makes almost no calls a process-wide cProfile would record
+        samples = self.samples
+        while not self._stop.wait(self.interval):
+            active = self._thread_ids
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in active:
+                    continue
+                stack = ()
+                while frame is not None:
+                    code = frame.f_code
+                    stack = ((code.co_name, code.co_filename, code.co_firstlineno),) + stack
+                    frame = frame.f_back
+                try:
+                    samples[stack] += 1
+                except KeyError:
+                    samples[stack] = 1
+
+    def write_folded(self, path):
+        folded = {}
+        for stack, count in self.samples.items():
+            key = ';'.join("{} ({}:{})".format(name, os.path.basename(filename), line)
+                           for name, filename, line in stack)
+            folded[key] = folded.get(key, 0) + count
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(folded.items()):
+                f.write("{} {}\n".format(stack, count))
+
+
+def drop_harness_calls(stats):
+    """
+    Remove harness, thread pool and threading functions from process-wide stats
+
+    A process-wide profiler (Python 3.12+) keeps one call stack for all
+    threads, so callers and cumulative times of interleaved threads are not
+    reliable, and shared builtins (e.g. lock.acquire) include the pool's
+    waits. Call counts and own time of the plugin's functions are exact.
+    """
+    harness_file = make_operation.__code__.co_filename
+    skip_dirs = (os.path.dirname(concurrent.futures.__file__), threading.__file__)
+
+    def is_harness(func):
+        filename, line, name = func
+        if filename == harness_file:
+            return name != 'operation'
+        return filename.startswith(skip_dirs)
+
+    for func in [func for func in stats.stats if is_harness(func)]:
+        del stats.stats[func]
+    for cc, nc, tt, ct, callers in stats.stats.values():
+        for caller in [caller for caller in callers if is_harness(caller)]:
+            del callers[caller]
+
+    stats.total_calls = stats.prim_calls = 0
+    stats.total_tt = 0
+    stats.top_level = set()
+    stats.get_top_level_stats()
+    return stats
+
+
+def write_memory_folded(snapshot, path):
+    """Write live allocations by traceback as folded stacks weighted in bytes"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for stat in snapshot.statistics('traceback'):
+            stack = ';'.join(
+                "{}:{}".format(os.path.basename(frame.filename), frame.lineno)
+                for frame in stat.traceback)  # Oldest frame first
+            f.write("{} {}\n".format(stack, stat.size))
+
+
+def filter_transpy(snapshot):
+    """Keep allocations with a transpy_*.py module of the package on the stack"""
+    return snapshot.filter_traces([
+        tracemalloc.Filter(True, os.path.join(PACKAGE_DIR, 'transpy_*.py'), all_frames=True)
+    ])
+
+
+def write_tracemalloc_report(before, after, peak, path, limit=25):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("Peak traced memory (whole process): {:.1f} KiB\n\n".format(peak / 1024.0))
+        f.write("Top {} allocation growth by line (transpy_*.py stacks only):\n".format(limit))
+        for stat in after.compare_to(before, 'lineno')[:limit]:
+            f.write("{}\n".format(stat))
+
+
+# ----------------------------------------------------------------------
+# Workloads
+
+class PluginOutputCounter:
+    """
+    stdout stand-in that counts the modules' 'Transpy...' prints instead of
+    echoing them (e.g. one per failed history load), passing the rest through
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.counts = {}
+        self._buffer = ''
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            self._buffer += text
+            while '\n' in self._buffer:
+                line, self._buffer = self._buffer.split('\n', 1)
+                if line.startswith('Transpy'):
+                    kind = line.split(' - ')[0]
+                    self.counts[kind] = self.counts.get(kind, 0) + 1
+                else:
+                    self.stream.write(line + '\n')
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class WorkloadStats:
+    """Latency and error bookkeeping for one workload"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = {}
+        self.elapsed = 0.0
+        self.threads = set()
+        self.cprofile = None        # Profiling mode, None when not profiled
+        self.profiled_threads = set()
+        self._lock = threading.Lock()
+
+    def record(self, latency, error=None, profiled=False):
+        with self._lock:
+            self.threads.add(threading.get_ident())
+            if profiled:
+                self.profiled_threads.add(threading.get_ident())
+            self.latencies.append(latency)
+            if error:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        ops = len(self.latencies)
+        summary = {
+            'workload': self.name,
+            'ops': ops,
+            'errors': sum(self.errors.values()),
+            'error_kinds': self.errors,
+            'elapsed_s': round(self.elapsed, 3),
+            'throughput_ops_s': round(ops / self.elapsed, 1) if self.elapsed else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 2),
+            'p90_ms': round(self.percentile(90) * 1000, 2),
+            'p99_ms': round(self.percentile(99) * 1000, 2),
+            'max_ms': round(max(self.latencies) * 1000, 2) if ops else 0.0,
+        }
+        if self.cprofile:
+            summary['cprofile'] = self.cprofile
+            summary['cprofile_threads'] = "{}/{}".format(len(self.profiled_threads), len(self.threads))
+        return summary
+
+
+def classify_error(result):
+    """Group translator error messages into a few buckets"""
+    message = result.get_error_message() or ''
+    if message.startswith("HTTP error "):
+        return "HTTP {}".format(message.split()[2].rstrip(':'))
+    if message.startswith("Network error"):
+        return "network"
+    return message.split(':')[0] or "unknown"
+
+
+def make_operation(workload, translator, history_mgr, args):
+    """Return a callable(i) performing one operation, returning an error or None"""
+    rng = random.Random(args.seed)
+    large_text = ' '.join(
+        rng.choice(SAMPLE_TEXTS) for _ in range(args.chunk_chars // 40 + 1))[:args.chunk_chars]
+
+    if workload == 'translate':
+        def operation(i):
+            result = translator.translate(SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)], 'auto', args.dest)
+            return classify_error(result) if result.is_error() else None
+    elif workload == 'chunk':
+        def operation(i):
+            result = translator.translate_large_text(large_text, 'auto', args.dest)
+            return classify_error(result) if result.is_error() else None
+    else:
+        def operation(i):
+            # Unique per operation so entries on disk can be told apart
+            text = "{} #{}".format(SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)], i)
+            if not history_mgr.save_entry(text, "[{}] {}".format(args.dest, text), 'auto', args.dest, 0.9):
+                return "save failed"
+            return None
+    return operation
+
+
+def run_workload(workload, args, translator, history_mgr, profilers=None, sampler=None):
+    """Run args.requests operations with args.concurrency worker threads"""
+    stats = WorkloadStats(workload)
+    operation = make_operation(workload, translator, history_mgr, args)
+    local = threading.local()
+
+    def timed(i):
+        if process_profiler is None and profilers is not None and not hasattr(local, 'profiler'):
+            # cProfile only sees its own thread, so each worker gets one
+            local.profiler = cProfile.Profile()
+            profilers.append(local.profiler)
+        profiler = getattr(local, 'profiler', None)
+
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        if sampler:
+            sampler.enter()
+        try:
+            error = operation(i)
+        except Exception as e:
+            error = type(e).__name__
+        finally:
+            if sampler:
+                sampler.leave()
+            if profiler:
+                profiler.disable()
+        stats.record(time.perf_counter() - start, error,
+                     profiled=profiler is not None or process_profiler is not None)
+
+    process_profiler = None
+    if profilers is not None:
+        stats.cprofile = 'per-thread'
+        if PROCESS_WIDE_CPROFILE:
+            # One profiler for all workers, drop_harness_calls() strips the harness
+            process_profiler = cProfile.Profile()
+            try:
+                process_profiler.enable()
+            except ValueError as e:
+                sys.stderr.write("Warning: cProfile disabled for {}, another profiler is active ({})\n".format(
+                    workload, e))
+                process_profiler = None
+                stats.cprofile = 'unavailable'
+            else:
+                profilers.append(process_profiler)
+                stats.cprofile = 'process-wide'
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(timed, range(args.requests)))
+    finally:
+        if process_profiler:
+            process_profiler.disable()
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def print_summary(summary):
+    print("\n== {workload} ==".format(**summary))
+    print("  ops: {ops}  errors: {errors}  elapsed: {elapsed_s}s  throughput: {throughput_ops_s} ops/s".format(**summary))
+    print("  latency ms  p50: {p50_ms}  p90: {p90_ms}  p99: {p99_ms}  max: {max_ms}".format(**summary))
+    if 'cprofile' in summary:
+        print("  cprofile: {cprofile}, {cprofile_threads} threads profiled".format(**summary))
+    for kind, count in sorted(summary['error_kinds'].items()):
+        print("  {:>6} x {}".format(count, kind))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test Transpy against a local mock endpoint")
+    parser.add_argument('--workload', action='append', choices=WORKLOADS,
+                        help="Workload to run, repeatable (default: all)")
+    parser.add_argument('--requests', type=int, default=200, help="Operations per workload")
+    parser.add_argument('--concurrency', type=int, default=8, help="Worker threads")
+    parser.add_argument('--dest', default='id', help="Target language")
+    parser.add_argument('--chunk-chars', type=int, default=20000, help="Text size for the chunk workload")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="Mock response latency")
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help="Mock latency jitter (+/-)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of random HTTP 429 responses")
+    parser.add_argument('--rate-limit', type=int, default=0, help="Requests/second before HTTP 429, 0 = unlimited")
+    parser.add_argument('--url', help="Use an already running endpoint instead of the built-in mock")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed for the mock and workloads")
+    parser.add_argument('--profile', metavar='DIR', help="Write cProfile stats and wall-clock folded stacks to DIR")
+    parser.add_argument('--tracemalloc', action='store_true', help="Trace memory allocations")
+    parser.add_argument('--json', action='store_true', help="Print summaries as JSON")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.serve:
+        return serve(args)
+
+    workloads = args.workload or list(WORKLOADS)
+    output_dir = args.profile or '.'
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = MockServerProcess(args)
+        url = server.url
+
+    history_dir = tempfile.mkdtemp(prefix='transpy_loadtest_')
+    translator = SyncTranslator(base_url=url)
+    history_mgr = HistoryManager(os.path.join(history_dir, 'history.json'))
+
+    profilers = [] if args.profile else None
+    sampler = SamplingProfiler().start() if args.profile else None
+    if args.tracemalloc:
+        tracemalloc.start(25)
+        before = tracemalloc.take_snapshot()
+
+    summaries = []
+    plugin_output = PluginOutputCounter(sys.stdout)
+    try:
+        with contextlib.redirect_stdout(plugin_output):
+            for workload in workloads:
+                summaries.append(run_workload(
+                    workload, args, translator, history_mgr, profilers, sampler).summary())
+
+            if 'history' in workloads:
+                # Every save used a unique text, so any save missing from the last
+                # max_entries on disk was lost to a concurrent read-modify-write
+                history_saves = next(x for x in summaries if x['workload'] == 'history')
+                summaries.append({
+                    'workload': 'history file',
+                    'saves_ok': history_saves['ops'] - history_saves['errors'],
+                    'entries_on_disk': len(history_mgr.load_history()),
+                    'max_entries': history_mgr.max_entries
+                })
+        if server:
+            summaries.append(dict(server.fetch_stats(), workload='mock server'))
+    finally:
+        if sampler:
+            sampler.stop()
+        if server:
+            server.stop()
+        shutil.rmtree(history_dir, ignore_errors=True)
+
+    if plugin_output.counts:
+        summaries.append(dict(plugin_output.counts, workload='plugin messages'))
+    if args.tracemalloc:
+        after = filter_transpy(tracemalloc.take_snapshot())
+        before = filter_transpy(before)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        write_memory_folded(after, os.path.join(output_dir, 'memory.folded'))
+        write_tracemalloc_report(before, after, peak, os.path.join(output_dir, 'tracemalloc.txt'))
+        summaries.append({'workload': 'tracemalloc', 'peak_kib': round(peak / 1024.0, 1)})
+
+    if args.profile:
+        stats = pstats.Stats(*profilers) if profilers else None
+        if stats and PROCESS_WIDE_CPROFILE:
+            drop_harness_calls(stats)
+        if stats:
+            stats.dump_stats(os.path.join(args.profile, 'cprofile.prof'))
+        sampler.write_folded(os.path.join(args.profile, 'wall.folded'))
+
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        for summary in summaries:
+            if 'ops' in summary:
+                print_summary(summary)
+            else:
+                print("\n== {} ==\n  {}".format(summary['workload'], ', '.join(
+                    "{}: {}".format(k, v) for k, v in sorted(summary.items()) if k != 'workload')))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# Persistent job queue for long-running translations - No dependencies!
+#
+# Every job lives in its own directory:
+#   job.json     - metadata and source chunks (written on create/status change)
+#   chunks.jsonl - one line per translated chunk (append-only checkpoint)
+# so a restart only loses the chunk that was in flight.
+
+import os
+import re
+import json
+import uuid
+import random
+import time
+import shutil
+import datetime
+import threading
+import queue
+
+from transpy_sync import SyncTranslator, TranslationResult
+
+STATUS_PENDING = 'pending'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+# A lock not refreshed for this long is abandoned even if its pid is alive
+# (the pid may have been reused after a crash)
+LOCK_STALE_AFTER = 600
+
+# Temporary errors (429, 5xx, network) are retried with exponential backoff
+# before a job is paused
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 2
+RETRY_MAX_DELAY = 300
+
+# Errors that will fail again on retry
+PERMANENT_ERRORS = ("No text", "Text too long", "Too many lines", "Invalid response")
+
+
+def is_permanent_error(message):
+    """Check if a translator error message is not worth retrying"""
+    message = message or ''
+    if message.startswith(PERMANENT_ERRORS):
+        return True
+    # 4xx other than timeouts and rate limiting means the request itself is bad
+    match = re.match(r'HTTP error (\d+)', message)
+    return bool(match) and match.group(1).startswith('4') and match.group(1) not in ('408', '429')
+
+
+def pid_alive(pid):
+    """Check if a process with this pid is running"""
+    if os.name == 'nt':
+        # os.kill() would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        running = kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)) and exit_code.value == 259
+        kernel32.CloseHandle(handle)
+        return bool(running)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by another user
+    except OSError:
+        return False
+    return True
+
+
+class JobQueue:
+    """Durable translation jobs with per-chunk checkpoints"""
+
+    def __init__(self, jobs_dir=None):
+        if jobs_dir is None:
+            jobs_dir = os.path.expanduser("~/.transpy_jobs")
+        self.jobs_dir = jobs_dir
+        self._lock = threading.Lock()
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def _meta_file(self, job_id):
+        return os.path.join(self._job_dir(job_id), 'job.json')
+
+    def _checkpoint_file(self, job_id):
+        return os.path.join(self._job_dir(job_id), 'chunks.jsonl')
+
+    def _lock_file(self, job_id):
+        return os.path.join(self._job_dir(job_id), 'worker.lock')
+
+    def create_job(self, chunks, src_lang, dest_lang, target=None):
+        """Store a new job and return its id"""
+        job_id = "{}-{}".format(
+            datetime.datetime.now().strftime('%Y%m%d%H%M%S'), uuid.uuid4().hex[:8])
+        job = {
+            'id': job_id,
+            'created': datetime.datetime.now().isoformat(),
+            'status': STATUS_PENDING,
+            'from_lang': src_lang,
+            'to_lang': dest_lang,
+            'chunks': list(chunks),
+            'target': target or {},
+            'error': None
+        }
+
+        os.makedirs(self._job_dir(job_id), exist_ok=True)
+        self._save_job(job)
+        return job_id
+
+    def _save_job(self, job):
+        """Write job metadata atomically"""
+        meta_file = self._meta_file(job['id'])
+        tmp_file = meta_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(job, ensure_ascii=False))
+        os.replace(tmp_file, meta_file)
+
+    def exists(self, job_id):
+        return os.path.exists(self._meta_file(job_id))
+
+    def load_job(self, job_id):
+        """Load job metadata, None if missing or unreadable"""
+        try:
+            with open(self._meta_file(job_id), 'r', encoding='utf-8') as f:
+                return json.loads(f.read())
+        except Exception as e:
+            print("Transpy: Failed to load job {} - {}".format(job_id, e))
+            return None
+
+    def set_status(self, job_id, status, error=None):
+        """Update job status"""
+        with self._lock:
+            job = self.load_job(job_id)
+            if job is None:
+                return False
+            if job['status'] == STATUS_CANCELLED and status != STATUS_CANCELLED:
+                # A cancel always wins over whatever the worker reports
+                return False
+            job['status'] = status
+            job['error'] = error
+            if status == STATUS_DONE:
+                # Lets a worker in the same process know delivery is already underway
+                job['finished_by'] = os.getpid()
+            self._save_job(job)
+            return True
+
+    def cancel(self, job_id):
+        """Mark a job cancelled, a running worker stops before the next chunk"""
+        return self.set_status(job_id, STATUS_CANCELLED)
+
+    def is_cancelled(self, job_id):
+        job = self.load_job(job_id) if self.exists(job_id) else None
+        return job is None or job['status'] == STATUS_CANCELLED
+
+    def acquire(self, job_id, timeout=60):
+        """
+        Take the per-job lock file, True on success
+
+        A plugin reload leaves the old worker finishing its chunk in flight,
+        so a lock held by this process is waited for. A lock held by another
+        live process (a second Sublime Text instance sharing the jobs
+        directory) is left alone. Only a lock whose owner is gone, or that
+        has not been refreshed for LOCK_STALE_AFTER seconds, is taken over.
+        """
+        lock_file = self._lock_file(job_id)
+        deadline = time.time() + timeout
+        while True:
+            try:
+                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    with open(lock_file, 'r') as f:
+                        owner = f.read().strip()
+                    age = time.time() - os.path.getmtime(lock_file)
+                except (IOError, OSError):
+                    continue  # Released in between, try again
+                if not owner.isdigit() or age > LOCK_STALE_AFTER or not pid_alive(int(owner)):
+                    self.release(job_id)
+                    continue
+                if int(owner) != os.getpid():
+                    return False
+                if time.time() > deadline:
+                    return False
+                time.sleep(0.2)
+            except (IOError, OSError):
+                return False  # Job directory is gone
+            else:
+                os.write(fd, str(os.getpid()).encode('ascii'))
+                os.close(fd)
+                return True
+
+    def refresh(self, job_id):
+        """Mark the lock as still in use"""
+        try:
+            os.utime(self._lock_file(job_id), None)
+        except (IOError, OSError):
+            pass
+
+    def release(self, job_id):
+        try:
+            os.remove(self._lock_file(job_id))
+        except (IOError, OSError):
+            pass
+
+    def checkpoint(self, job_id, index, text, from_memory=False):
+        """Record a translated chunk"""
+        line = json.dumps({'index': index, 'text': text, 'from_memory': from_memory}, ensure_ascii=False)
+        with self._lock:
+            with open(self._checkpoint_file(job_id), 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def completed_chunks(self, job_id):
+        """Return {chunk index: checkpoint entry} for checkpointed chunks"""
+        done = {}
+        checkpoint_file = self._checkpoint_file(job_id)
+        if not os.path.exists(checkpoint_file):
+            return done
+
+        with open(checkpoint_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash mid-chunk, it will be redone
+                    continue
+                done[entry['index']] = entry
+        return done
+
+    def get_progress(self, job_id):
+        """Return (done, total) chunk counts"""
+        job = self.load_job(job_id)
+        if job is None:
+            return 0, 0
+        return len(self.completed_chunks(job_id)), len(job['chunks'])
+
+    def list_jobs(self):
+        """
+        List stored jobs, oldest first
+
+        Jobs stay on disk until their result is delivered and remove_job()
+        is called, so a finished but undelivered job is listed too.
+        """
+        if not os.path.isdir(self.jobs_dir):
+            return []
+
+        jobs = []
+        for job_id in sorted(os.listdir(self.jobs_dir)):
+            job = self.load_job(job_id)
+            if job:
+                jobs.append(job)
+        return jobs
+
+    def remove_job(self, job_id):
+        """Delete a job and its checkpoints"""
+        job_dir = self._job_dir(job_id)
+        if os.path.isdir(job_dir):
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return True
+        return False
+
+    def _wait(self, job_id, delay, should_stop):
+        """Sleep before a retry, True if told to stop meanwhile"""
+        deadline = time.time() + delay
+        while time.time() < deadline:
+            if should_stop and should_stop():
+                return True
+            self.refresh(job_id)
+            time.sleep(min(1.0, max(0.0, deadline - time.time())))
+        return False
+
+    def translate_with_retry(self, job_id, translator, chunk, src, dest, should_stop=None):
+        """
+        Translate one chunk, retrying temporary errors with backoff
+
+        Honours Retry-After from the server. Returns the last result, or
+        None if told to stop while waiting.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            self.refresh(job_id)
+            result = translator.translate_chunk(chunk, src, dest)
+            if not result.is_error():
+                return result
+            message = result.get_error_message()
+            if is_permanent_error(message) or attempt == MAX_RETRIES:
+                return result
+
+            delay = getattr(result, 'retry_after', None)
+            if delay is None:
+                delay = RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5)
+            delay = min(delay, RETRY_MAX_DELAY)
+            print("Transpy: Job {} - {}, retrying in {:.0f}s ({}/{})".format(
+                job_id, message, delay, attempt + 1, MAX_RETRIES))
+            if self._wait(job_id, delay, should_stop):
+                return None
+        return result
+
+    def run_job(self, job_id, translator, progress_callback=None, should_stop=None):
+        """
+        Translate remaining chunks of a job, checkpointing each one
+
+        Returns the combined TranslationResult, an error result if a chunk
+        failed, or None if stopped early. Temporary errors are retried first;
+        if they persist the job stays pending, permanent errors mark it failed.
+        """
+        job = self.load_job(job_id)
+        if job is None:
+            return TranslationResult("[ERROR] Job {} not found".format(job_id), 'auto', 0.0)
+
+        chunks = job['chunks']
+        src, dest = job['from_lang'], job['to_lang']
+        done = self.completed_chunks(job_id)
+
+        for i, chunk in enumerate(chunks):
+            if i in done:
+                continue
+            if should_stop and should_stop():
+                return None
+
+            result = self.translate_with_retry(job_id, translator, chunk, src, dest, should_stop)
+            if result is None:
+                return None
+            if result.is_error():
+                message = result.get_error_message()
+                status = STATUS_FAILED if is_permanent_error(message) else STATUS_PENDING
+                self.set_status(job_id, status, message)
+                return result
+
+            self.checkpoint(job_id, i, result.text, result.from_memory)
+            done[i] = {'text': result.text, 'from_memory': result.from_memory}
+
+            if progress_callback:
+                progress_callback(job, len(done), len(chunks))
+
+        # Last chance to honour a cancel that landed during the final chunk
+        if should_stop and should_stop():
+            return None
+
+        self.set_status(job_id, STATUS_DONE)
+        translated = [done[i]['text'] for i in range(len(chunks))]
+        result = TranslationResult(translator.join_chunks(translated), src, 0.8)  # Lower confidence for chunks
+        result.memory_chunks = sum(1 for entry in done.values() if entry.get('from_memory'))
+        return result
+
+
+class JobWorker:
+    """Single background thread that drains a JobQueue"""
+
+    def __init__(self, job_queue, translator_factory=SyncTranslator,
+                 on_progress=None, on_complete=None, on_error=None):
+        self.job_queue = job_queue
+        self.translator_factory = translator_factory
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self.on_error = on_error
+        self._pending = queue.Queue()
+        self._queued = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self._current = None
+        self._lock = threading.Lock()
+
+    def submit(self, job_id):
+        """Schedule a job, ignoring jobs already waiting"""
+        with self._lock:
+            if job_id in self._queued:
+                return
+            self._queued.add(job_id)
+            self._pending.put(job_id)
+
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def resume_all(self):
+        """Schedule every stored job that can still succeed, returns the count"""
+        jobs = [job for job in self.job_queue.list_jobs() if job['status'] != STATUS_FAILED]
+        for job in jobs:
+            self.submit(job['id'])
+        return len(jobs)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. If it is running, the worker stops before the next
+        chunk and deletes the files once it has let go of the job.
+        """
+        with self._lock:
+            self.job_queue.cancel(job_id)
+            if job_id != self._current:
+                self.job_queue.remove_job(job_id)
+
+    def stop(self):
+        """Stop after the chunk in flight; unfinished jobs stay on disk"""
+        self._stop.set()
+        self._pending.put(None)
+
+    def _run(self):
+        translator = self.translator_factory()
+
+        while not self._stop.is_set():
+            job_id = self._pending.get()
+            if job_id is None:
+                break
+
+            with self._lock:
+                self._queued.discard(job_id)
+                if self.job_queue.is_cancelled(job_id):
+                    # Cancelled while waiting in the queue
+                    self.job_queue.remove_job(job_id)
+                    continue
+                self._current = job_id
+
+            if not self.job_queue.acquire(job_id):
+                print("Transpy: Job {} is held by another worker, skipped".format(job_id))
+                with self._lock:
+                    self._current = None
+                continue
+
+            job = self.job_queue.load_job(job_id)
+            finished_by = job.get('finished_by') if job else None
+            if job and job['status'] == STATUS_DONE and finished_by and pid_alive(finished_by):
+                # Finished by a live worker (this session or another instance), already being delivered
+                self.job_queue.release(job_id)
+                with self._lock:
+                    self._current = None
+                continue
+
+            should_stop = lambda: self._stop.is_set() or self.job_queue.is_cancelled(job_id)
+            try:
+                result = self.job_queue.run_job(job_id, translator, self.on_progress, should_stop)
+            except Exception as e:
+                result = TranslationResult("[ERROR] Job failed: {}".format(e), 'auto', 0.0)
+            finally:
+                self.job_queue.release(job_id)
+                with self._lock:
+                    self._current = None
+                    cancelled = self.job_queue.is_cancelled(job_id)
+                    if cancelled:
+                        self.job_queue.remove_job(job_id)
+
+            if cancelled:
+                continue
+            if result is None:
+                break
+
+            job = self.job_queue.load_job(job_id) or {'id': job_id}
+            if result.is_error():
+                if self.on_error:
+                    self.on_error(job, result.get_error_message())
+            elif self.on_complete:
+                self.on_complete(job, result)
@@ -1,6 +1,7 @@
 import sublime
 import sublime_plugin
 import threading
+import hashlib
 import os
 import sys
 
@@ -12,12 +13,179 @@ sys.path.insert(0, os.path.dirname(__file__))
 try:
     from transpy_sync import SyncTranslator, TranslationResult
     from transpy_history import HistoryManager
+    from transpy_jobs import JobQueue, JobWorker, STATUS_FAILED
+    from transpy_tm import TranslationMemory
     print("✅ Transpy: All modules imported successfully")
 except ImportError as e:
     error_msg = "❌ Transpy: Failed to import core module - {}".format(e)
     print(error_msg)
     sublime.error_message(error_msg)
 
+job_queue = None
+job_worker = None
+translation_memory = None
+
+
+def plugin_loaded():
+    """Open the translation memory and resume jobs left over from a previous session"""
+    global job_queue, job_worker, translation_memory
+    settings = sublime.load_settings("Transpy.sublime-settings")
+    if settings.get("enable_translation_memory", True):
+        translation_memory = TranslationMemory(
+            fuzzy_threshold=settings.get("tm_fuzzy_threshold", 0.85))
+    
+    job_queue = JobQueue()
+    job_worker = JobWorker(
+        job_queue,
+        translator_factory=create_translator,
+        on_progress=on_job_progress,
+        on_complete=on_job_complete,
+        on_error=on_job_error
+    )
+    count = job_worker.resume_all()
+    if count:
+        print("Transpy: Resuming {} translation job(s)".format(count))
+        sublime.status_message("🔄 Transpy: Resuming {} translation job(s)...".format(count))
+
+
+def plugin_unloaded():
+    """
+    Stop the job worker, unfinished jobs stay on disk. The chunk in flight
+    still finishes, the per-job lock keeps the next worker off that job.
+    """
+    if job_worker is not None:
+        job_worker.stop()
+    if translation_memory is not None:
+        translation_memory.close()
+
+
+def create_translator():
+    """Translator that checks the translation memory before the network"""
+    return SyncTranslator(translation_memory)
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def on_job_progress(job, done, total):
+    sublime.set_timeout(lambda: sublime.status_message(
+        "🔄 Transpy: Translating chunk {}/{} ({:.0f}%)".format(
+            done, total, 100.0 * done / total)), 0)
+
+
+def on_job_error(job, message):
+    if job.get('status') == STATUS_FAILED:
+        status_msg = "❌ Transpy: Job failed - {} (see 'Transpy: Show Translation Jobs')".format(message)
+        print("Transpy Error: Job {} failed - {}".format(job['id'], message))
+    else:
+        status_msg = "❌ Transpy: Job paused - {} (run 'Transpy: Resume Translation Jobs' to retry)".format(message)
+        print("Transpy Error: Job {} paused - {}".format(job['id'], message))
+    sublime.set_timeout(lambda: sublime.status_message(status_msg), 0)
+
+
+def on_job_complete(job, result):
+    sublime.set_timeout(lambda: deliver_job_result(job, result), 0)
+
+
+def find_job_view(target):
+    """
+    Find the view a job was started from, if it is still open
+
+    View ids are handed out again every session, so a saved file is looked
+    up by name. The id is only trusted for an untitled buffer, and only in
+    the plugin host session that created the job.
+    """
+    file_name = target.get('file_name')
+    if file_name:
+        for window in sublime.windows():
+            view = window.find_open_file(file_name)
+            if view is not None:
+                return view
+        return None
+    
+    if target.get('session') != os.getpid():
+        return None
+    for window in sublime.windows():
+        for view in window.views():
+            if view.id() == target.get('view_id') and view.file_name() is None:
+                return view
+    return None
+
+
+def show_memory_notice(window, original, translated, score, source, chunks=None):
+    """Tell the user a translation came from the translation memory"""
+    if chunks:
+        summary = "{}/{} chunks from translation memory".format(chunks[0], chunks[1])
+    else:
+        summary = "from translation memory ({:.0f}% match)".format(score * 100)
+    sublime.status_message("📚 Transpy: Translation {}".format(summary))
+    
+    if window is None:
+        return
+    panel = window.create_output_panel("transpy_output")
+    output_text = "📚 TRANSLATION MEMORY: {}\n\n".format(summary)
+    if source is not None and source != original:
+        output_text += "Memory source:\n{}\n\n".format(source)
+    output_text += "Original:\n{}\n\nTranslated:\n{}\n\n---\n".format(original, translated)
+    panel.run_command("append", {"characters": output_text})
+    window.run_command("show_panel", {"panel": "output.transpy_output"})
+
+
+def job_region_key(job_id):
+    return "transpy_job_{}".format(job_id)
+
+
+def deliver_job_result(job, result):
+    """Put a finished job back into its view - called from main thread"""
+    if job_queue.is_cancelled(job['id']):
+        # Cancelled after the worker finished, before this ran
+        return
+    
+    target = job.get('target', {})
+    view = find_job_view(target)
+    region = target.get('region')
+
+    if view is not None and view.is_loading():
+        # File reopened after a restart, wait until it is loaded
+        sublime.set_timeout(lambda: deliver_job_result(job, result), 500)
+        return
+
+    if view is not None:
+        # Tracked region follows edits made while the job ran; stored
+        # offsets are only a fallback after a restart
+        tracked = view.get_regions(job_region_key(job['id']))
+        view.erase_regions(job_region_key(job['id']))
+        if tracked:
+            region = [tracked[0].a, tracked[0].b]
+
+    # Only replace in place if the original text is still where we left it
+    if view is not None and region:
+        current = view.substr(sublime.Region(region[0], region[1]))
+        if text_hash(current) == target.get('original_hash'):
+            view.run_command("transpy_replace_text", {
+                "region": region,
+                "text": result.text,
+                "original_text": current,
+                "show_notification": True
+            })
+            if result.memory_chunks:
+                show_memory_notice(view.window(), current, result.text, None, None,
+                                   chunks=(result.memory_chunks, len(job['chunks'])))
+            job_queue.remove_job(job['id'])
+            return
+
+    window = sublime.active_window()
+    if window is None:
+        return
+    new_view = window.new_file()
+    new_view.set_scratch(True)
+    new_view.set_name("Transpy: {}→{}".format(job['from_lang'], job['to_lang']))
+    new_view.run_command("append", {"characters": result.text})
+    sublime.status_message("✅ Transpy: Original text changed, translation opened in new tab")
+    job_queue.remove_job(job['id'])
+
+
 class TranspyTranslateCommand(sublime_plugin.TextCommand):
     def run(self, edit, src_lang="auto", dest_lang="id", reverse=False, show_notification=True):
         print("🎯 Transpy: Command executed with args: src={}, dest={}".format(src_lang, dest_lang))
@@ -54,13 +222,24 @@ class TranspyTranslateCommand(sublime_plugin.TextCommand):
         for region, text in regions_to_translate:
             self.translate_region(region, text, src_lang, dest_lang, show_notification)
 
-    def translate_region(self, region, text, src_lang, dest_lang, show_notification):
+    def translate_region(self, region, text, src_lang, dest_lang, show_notification, suggest_memory=True):
         """Translate text using threading"""
+        translator = create_translator()
+        if translator.needs_chunking(text):
+            self.enqueue_large_translation(translator, region, text, src_lang, dest_lang)
+            return
         
         def do_translation():
             try:
+                # Fuzzy memory hits are only suggestions, the user has to pick them
+                if suggest_memory and translation_memory is not None:
+                    match = translation_memory.lookup(text, src_lang, dest_lang)
+                    if match is not None and not match.is_exact():
+                        sublime.set_timeout(lambda: self.suggest_memory_match(
+                            region, text, match, src_lang, dest_lang, show_notification), 0)
+                        return
+                
                 # Perform translation (sync)
-                translator = SyncTranslator()
                 result = translator.translate(text, src_lang, dest_lang)
                 
                 # ✅ FIX: Check if result has is_error method dan jika error
@@ -81,6 +260,50 @@ class TranspyTranslateCommand(sublime_plugin.TextCommand):
         thread.daemon = True
         thread.start()
     
+    def enqueue_large_translation(self, translator, region, text, src_lang, dest_lang):
+        """Queue large text as a durable job that survives restarts"""
+        target = {
+            'view_id': self.view.id(),
+            'session': os.getpid(),
+            'file_name': self.view.file_name(),
+            'region': [region.a, region.b],
+            'original_hash': text_hash(text)
+        }
+        chunks = translator.chunk_text(text)
+        for chunk in chunks:
+            is_valid, validation_msg = translator.validate_text(chunk.strip())
+            if not is_valid:
+                self.show_error("Text cannot be split for translation - {}".format(validation_msg))
+                return
+        
+        job_id = job_queue.create_job(chunks, src_lang, dest_lang, target)
+        self.view.add_regions(job_region_key(job_id), [region], "", "", sublime.HIDDEN)
+        job_worker.submit(job_id)
+        sublime.status_message("🔄 Transpy: Large text queued as job {}".format(job_id))
+    
+    def suggest_memory_match(self, region, text, match, src_lang, dest_lang, show_notification):
+        """Let the user choose between a fuzzy memory match and a fresh translation"""
+        items = [
+            ["📚 Use translation memory ({:.0f}% match)".format(match.score * 100),
+             "Translation: {}".format(match.translated),
+             "Memory source: {}".format(match.original)],
+            ["🌐 Translate with Google instead",
+             "Text: {}".format(text[:60] + "..." if len(text) > 60 else text),
+             ""]
+        ]
+        
+        def on_select(index):
+            if index == 0:
+                result = TranslationResult(match.translated, match.from_lang, match.score,
+                                           from_memory=True, memory_source=match.original)
+                self.replace_text(region, result.text, text, result, show_notification)
+            elif index == 1:
+                self.translate_region(region, text, src_lang, dest_lang, show_notification, suggest_memory=False)
+            else:
+                sublime.status_message("Transpy: Translation cancelled")
+        
+        self.view.window().show_quick_panel(items, on_select)
+    
     def replace_text(self, region, translated_text, original_text, result, show_notification):
         """Replace text in the view - called from main thread"""
         try:
@@ -91,6 +314,11 @@ class TranspyTranslateCommand(sublime_plugin.TextCommand):
                 "original_text": original_text,
                 "show_notification": show_notification
             })
+            
+            # Memory hits are always announced, even without notifications
+            if getattr(result, 'from_memory', False):
+                show_memory_notice(self.view.window(), original_text, translated_text,
+                                   result.confidence, result.memory_source)
                 
         except Exception as e:
             self.show_error("Failed to replace text: {}".format(e))
@@ -276,4 +504,109 @@ class TranspyShowHistoryCommand(sublime_plugin.WindowCommand):
             placeholder="Select translation to copy to clipboard"
         )
 
+class TranspyResumeJobsCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        """Retry all unfinished translation jobs"""
+        count = job_worker.resume_all()
+        if count:
+            sublime.status_message("🔄 Transpy: Resuming {} translation job(s)...".format(count))
+        else:
+            sublime.status_message("📝 Transpy: No translation jobs pending")
+
+
+class TranspyShowJobsCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        """Show pending translation jobs, selecting one cancels it"""
+        jobs = job_queue.list_jobs()
+        if not jobs:
+            sublime.status_message("📝 Transpy: No translation jobs pending")
+            return
+        
+        items = []
+        for job in jobs:
+            done, total = job_queue.get_progress(job['id'])
+            lang_pair = "{}→{}".format(job['from_lang'], job['to_lang'])
+            display_text = "{} {}: {}/{} chunks".format(job['created'][:19], lang_pair, done, total)
+            detail = os.path.basename(job['target'].get('file_name') or 'untitled')
+            if job['error']:
+                detail = "{}: {}".format(job['status'], job['error'])
+            items.append([display_text, detail])
+        
+        def on_select(index):
+            if index >= 0 and sublime.ok_cancel_dialog(
+                    "Cancel translation job {}?".format(jobs[index]['id']), "Cancel Job"):
+                job = jobs[index]
+                job_worker.cancel(job['id'])
+                view = find_job_view(job['target'])
+                if view is not None:
+                    view.erase_regions(job_region_key(job['id']))
+                sublime.status_message("✅ Transpy: Translation job cancelled")
+        
+        self.window.show_quick_panel(items, on_select)
+
+class TranspyImportTranslationMemoryCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        """Import a TMX or JSONL translation memory"""
+        if translation_memory is None:
+            sublime.status_message("❌ Transpy: Translation memory is disabled in settings")
+            return
+        
+        self.window.show_input_panel(
+            "Transpy: TMX/JSONL file to import:", "", self.do_import, None, None)
+    
+    def do_import(self, path):
+        path = os.path.expanduser(path.strip())
+        if not os.path.isfile(path):
+            sublime.status_message("❌ Transpy: File not found - {}".format(path))
+            return
+        
+        def on_progress(stage, count):
+            sublime.set_timeout(lambda: sublime.status_message(
+                "🔄 Transpy: Translation memory {} - {} segments".format(
+                    'importing' if stage == 'import' else 'indexing', count)), 0)
+        
+        def import_async():
+            try:
+                count = translation_memory.import_file(path, progress_callback=on_progress)
+                sublime.set_timeout(lambda: sublime.status_message(
+                    "✅ Transpy: Imported {} new segments ({} total)".format(count, translation_memory.count)), 0)
+            except Exception as e:
+                error_msg = "Translation memory import failed - {}".format(e)
+                print("Transpy Error: {}".format(error_msg))
+                sublime.set_timeout(lambda: sublime.status_message("❌ Transpy: {}".format(error_msg)), 0)
+        
+        sublime.status_message("🔄 Transpy: Importing translation memory...")
+        thread = threading.Thread(target=import_async)
+        thread.daemon = True
+        thread.start()
+
+
+class TranspyExportTranslationMemoryCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        """Export the translation memory as TMX or JSONL (by extension)"""
+        if translation_memory is None:
+            sublime.status_message("❌ Transpy: Translation memory is disabled in settings")
+            return
+        
+        self.window.show_input_panel(
+            "Transpy: Export translation memory to (.tmx or .jsonl):",
+            os.path.expanduser("~/transpy_tm.tmx"), self.do_export, None, None)
+    
+    def do_export(self, path):
+        path = os.path.expanduser(path.strip())
+        
+        def export_async():
+            try:
+                count = translation_memory.export_file(path)
+                sublime.set_timeout(lambda: sublime.status_message(
+                    "✅ Transpy: Exported {} segments to {}".format(count, path)), 0)
+            except Exception as e:
+                error_msg = "Translation memory export failed - {}".format(e)
+                print("Transpy Error: {}".format(error_msg))
+                sublime.set_timeout(lambda: sublime.status_message("❌ Transpy: {}".format(error_msg)), 0)
+        
+        thread = threading.Thread(target=export_async)
+        thread.daemon = True
+        thread.start()
+
 print("✅ Transpy: Plugin loaded successfully!")
\ No newline at end of file
@@ -9,14 +9,18 @@
 
 import urllib.request
 import urllib.parse
+import urllib.error
 import json
 import re  # Untuk sentence splitting
+import time
+import email.utils
 
 class SyncTranslator:
     """Synchronous translator using Google Translate API - No dependencies!"""
     
-    def __init__(self):
-        self.base_url = "https://translate.googleapis.com/translate_a/single"
+    def __init__(self, translation_memory=None, base_url=None):
+        self.base_url = base_url or "https://translate.googleapis.com/translate_a/single"
+        self.translation_memory = translation_memory  # Optional TranslationMemory, checked before network
         self.languages = self._load_languages()
         self.max_chars = 4500  # Google limit ~5000, kita kasih buffer
         self.max_lines = 50    # Prevent huge blocks
@@ -78,6 +82,14 @@ class SyncTranslator:
         if not is_valid:
             return TranslationResult("[ERROR] {}".format(validation_msg), src, 0.0)
         
+        # Exact translation memory hit skips the network. Fuzzy hits belong
+        # to a different sentence, callers must ask before using them.
+        if self.translation_memory is not None:
+            match = self.translation_memory.lookup(text, src, dest, min_score=1.0)
+            if match is not None:
+                return TranslationResult(match.translated, match.from_lang, match.score,
+                                         from_memory=True, memory_source=match.original)
+        
         params = {
             'client': 'gtx',
             'dt': 't',
@@ -124,12 +136,15 @@ class SyncTranslator:
                         0.0
                     )
         
-        except urllib.error.URLError as e:
-            error_msg = "Network error: {}".format(e.reason if hasattr(e, 'reason') else str(e))
-            return TranslationResult("[ERROR] {}".format(error_msg), src, 0.0)
-        
+        # HTTPError is a subclass of URLError, so it has to come first
         except urllib.error.HTTPError as e:
             error_msg = "HTTP error {}: {}".format(e.code, e.reason)
+            result = TranslationResult("[ERROR] {}".format(error_msg), src, 0.0)
+            result.retry_after = parse_retry_after(e.headers.get('Retry-After') if e.headers else None)
+            return result
+        
+        except urllib.error.URLError as e:
+            error_msg = "Network error: {}".format(e.reason if hasattr(e, 'reason') else str(e))
             return TranslationResult("[ERROR] {}".format(error_msg), src, 0.0)
         
         except Exception as e:
@@ -147,75 +162,87 @@ class SyncTranslator:
             # Text is within limits, use normal translation
             return self.translate(text, src, dest)
         
-        # If text is too large, split into chunks
-        if len(text) > self.max_chars:
-            chunks = self._split_text_chunks(text, self.max_chars - 100)  # Buffer for safety
-            if len(chunks) == 1:
-                # Even after splitting, one chunk is still too large
-                return TranslationResult(
-                    "[ERROR] Text too large to process. Please split manually.",
-                    src,
-                    0.0
-                )
-            
-            results = []
-            for i, chunk in enumerate(chunks):
-                # FIX: Gunakan format() bukan f-string
-                print("Translating chunk {}/{} ({} chars)...".format(
-                    i + 1, len(chunks), len(chunk)))
-                
-                result = self.translate(chunk, src, dest)
-                if result.is_error():  # ✅ Method ini HARUS ada di TranslationResult
-                    return result
-                results.append(result.text)
-            
-            # Combine results
-            combined_text = "\n\n".join(results)
-            return TranslationResult(combined_text, src, 0.8)  # Lower confidence for chunks
+        if not self.needs_chunking(text):
+            return TranslationResult("[ERROR] {}".format(validation_msg), src, 0.0)
+        
+        results = []
+        for chunk in self.chunk_text(text):
+            result = self.translate_chunk(chunk, src, dest)
+            if result.is_error():  # ✅ Method ini HARUS ada di TranslationResult
+                return result
+            results.append(result.text)
         
-        return TranslationResult("[ERROR] {}".format(validation_msg), src, 0.0)
+        # Combine results
+        return TranslationResult(self.join_chunks(results), src, 0.8)  # Lower confidence for chunks
     
-    def _split_text_chunks(self, text, chunk_size):
-        """Split text into chunks at paragraph boundaries"""
-        # First try to split by paragraphs
-        paragraphs = text.split('\n\n')
+    def needs_chunking(self, text):
+        """Check if non-empty text is over the character or line limit"""
+        if not text or not text.strip():
+            return False
+        return len(text) > self.max_chars or text.count('\n') + 1 > self.max_lines
+    
+    def chunk_text(self, text):
+        """
+        Split large text into chunks that each pass validate_text
+
+        Chunks are contiguous slices of text, so ''.join(chunks) == text and
+        punctuation, line breaks and paragraph breaks are kept as they are.
+        """
+        chunk_size = self.max_chars - 100  # Buffer for safety
         chunks = []
-        current_chunk = ""
-        
-        for paragraph in paragraphs:
-            # If single paragraph is larger than chunk_size, split by sentences
-            if len(paragraph) > chunk_size:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = ""
-                
-                # Split large paragraph by sentences
-                sentences = self._split_sentences(paragraph)
-                for sentence in sentences:
-                    if len(current_chunk) + len(sentence) + 2 <= chunk_size:
-                        current_chunk += sentence + " "
-                    else:
-                        if current_chunk:
-                            chunks.append(current_chunk.strip())
-                        current_chunk = sentence + " "
+        current = ""
+        for piece in self._split_pieces(text, chunk_size):
+            if current and not self._chunk_fits(current + piece, chunk_size):
+                chunks.append(current)
+                current = piece
             else:
-                if len(current_chunk) + len(paragraph) + 2 <= chunk_size:
-                    current_chunk += paragraph + "\n\n"
-                else:
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = paragraph + "\n\n"
-        
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-        
+                current += piece
+        if current:
+            chunks.append(current)
         return chunks
     
-    def _split_sentences(self, text):
-        """Simple sentence splitting (basic implementation)"""
-        # Basic sentence splitting by common endings
-        sentences = re.split(r'[.!?]+', text)
-        return [s.strip() for s in sentences if s.strip()]
+    def translate_chunk(self, chunk, src='auto', dest='en'):
+        """Translate one chunk, keeping its surrounding whitespace"""
+        body = chunk.strip()
+        if not body:
+            return TranslationResult(chunk, src, 1.0)
+        
+        result = self.translate(body, src, dest)
+        if not result.is_error():
+            leading = chunk[:len(chunk) - len(chunk.lstrip())]
+            trailing = chunk[len(chunk.rstrip()):]
+            result.text = leading + result.text + trailing
+        return result
+    
+    def join_chunks(self, translated_chunks):
+        """Combine chunks from translate_chunk back into one text"""
+        return "".join(translated_chunks)
+    
+    # Paragraphs, then lines, then sentences, then words
+    _CHUNK_SEPARATORS = [r'\n[ \t]*\n\s*', r'\n', r'(?<=[.!?\u3002\uff01\uff1f])\s+', r'\s+']
+    
+    def _chunk_fits(self, chunk, chunk_size):
+        body = chunk.strip()
+        return len(body) <= chunk_size and body.count('\n') + 1 <= self.max_lines
+    
+    def _split_pieces(self, text, chunk_size, level=0):
+        """Cut text into contiguous pieces that each fit a chunk"""
+        if self._chunk_fits(text, chunk_size):
+            return [text]
+        
+        if level >= len(self._CHUNK_SEPARATORS):
+            # No separator left (e.g. one huge word), hard split
+            return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        
+        pieces = []
+        start = 0
+        for match in re.finditer(self._CHUNK_SEPARATORS[level], text):
+            if match.end() > start:
+                pieces.extend(self._split_pieces(text[start:match.end()], chunk_size, level + 1))
+                start = match.end()
+        if start < len(text):
+            pieces.extend(self._split_pieces(text[start:], chunk_size, level + 1))
+        return pieces
     
     def detect_language(self, text):
         """Detect language of given text"""
@@ -263,13 +290,30 @@ class SyncTranslator:
         return self.languages.get(code, code)
 
 
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delay or HTTP date), None if absent"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0, email.utils.mktime_tz(parsed) - time.time())
+
+
 class TranslationResult:
     """Translation result container - FIXED dengan semua method"""
     
-    def __init__(self, text, detected_lang, confidence=0.0):
+    def __init__(self, text, detected_lang, confidence=0.0, from_memory=False, memory_source=None):
         self.text = text
         self.detected_lang = detected_lang
-        self.confidence = confidence
+        self.confidence = confidence  # Match score for translation memory hits
+        self.from_memory = from_memory
+        self.memory_source = memory_source  # Source segment of the memory hit
+        self.memory_chunks = 0  # Chunks taken from the translation memory (jobs)
+        self.retry_after = None  # Seconds the server asked us to wait (429/503)
     
     def is_error(self):
         """Check if result is an error message - METHOD YANG DIBUTUHKAN"""
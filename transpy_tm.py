@@ -0,0 +1,696 @@
+#!/usr/bin/env python3
+# Translation memory for Transpy - No dependencies!
+#
+# Segments are kept in an append-only JSONL store with memory-mapped
+# binary indexes next to it:
+#   segments.jsonl - one {"from_lang", "to_lang", "original", "translated"} per line
+#   offsets.bin    - uint64 byte offset of every segment in the store
+#   exact.bin/.ids - sorted uint64 key hashes and their segment ids
+#   grams.dir/.bin - trigram buckets -> uint32 segment ids (inverted index)
+# Lookups only touch a handful of pages, so they stay fast on TMs with
+# millions of segments without loading them into memory.
+
+import os
+import re
+import sys
+import json
+import mmap
+import array
+import bisect
+import difflib
+import hashlib
+import heapq
+import itertools
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import Counter
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape, quoteattr
+
+INDEX_VERSION = 1
+GRAM_BUCKETS = 1 << 18
+GRAM_SIZE = 3
+SORT_RUN = 1 << 20      # Segment ids sorted in memory at a time
+SORT_BLOCK = 1 << 16    # Entries read/written per block while merging runs
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+
+def normalize_lang(code):
+    """Map 'en-US', 'EN_gb' etc. to the plugin's language codes"""
+    if not code:
+        return 'auto'
+    code = code.lower().replace('_', '-')
+    if code in ('zh-cn', 'zh-tw'):
+        return code
+    return code.split('-')[0]
+
+
+def normalize_text(text):
+    """Collapse whitespace for exact matching"""
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class TMMatch:
+    """Translation memory hit"""
+
+    def __init__(self, original, translated, from_lang, to_lang, score):
+        self.original = original
+        self.translated = translated
+        self.from_lang = from_lang
+        self.to_lang = to_lang
+        self.score = score
+
+    def is_exact(self):
+        return self.score >= 1.0
+
+
+class TranslationMemory:
+    """On-disk translation memory with exact and fuzzy lookup"""
+
+    def __init__(self, tm_dir=None, fuzzy_threshold=0.85):
+        if tm_dir is None:
+            tm_dir = os.path.expanduser("~/.transpy_tm")
+        self.tm_dir = tm_dir
+        self.fuzzy_threshold = fuzzy_threshold
+        self.max_candidates = 30      # Candidates verified per fuzzy lookup
+        self.max_postings = 50000     # Skip trigrams more common than this
+        self._lock = threading.RLock()
+        self._import_lock = threading.Lock()
+        self._maps = []
+        self._views = []
+        self.count = 0
+        self._open()
+
+    def _path(self, name):
+        return os.path.join(self.tm_dir, name)
+
+    # ------------------------------------------------------------------
+    # Index files
+
+    def _map_file(self, name, fmt=None):
+        """mmap a file read-only, optionally as a typed memoryview"""
+        with open(self._path(name), 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mm)
+        if fmt is None:
+            return mm
+        view = memoryview(mm).cast(fmt)
+        self._views.append(view)
+        return view
+
+    def _open(self):
+        """Map the index files if an index has been built"""
+        with self._lock:
+            try:
+                with open(self._path('meta.json'), 'r', encoding='utf-8') as f:
+                    meta = json.loads(f.read())
+            except (IOError, OSError, ValueError):
+                return
+
+            if meta.get('version') != INDEX_VERSION or meta.get('byteorder') != sys.byteorder:
+                print("Transpy: Translation memory index is outdated, please re-import")
+                return
+            if not meta.get('count'):
+                return
+
+            try:
+                self._store = self._map_file('segments.jsonl')
+                self._offsets = self._map_file('offsets.bin', 'Q')
+                self._exact_keys = self._map_file('exact.bin', 'Q')
+                self._exact_ids = self._map_file('exact.ids', 'I')
+                self._gram_dir = self._map_file('grams.dir', 'Q')
+                self._postings = self._map_file('grams.bin', 'I')
+                self.count = meta['count']
+            except Exception as e:
+                print("Transpy: Failed to open translation memory - {}".format(e))
+                self.close()
+
+    def close(self):
+        """Release all memory maps"""
+        with self._lock:
+            for view in self._views:
+                view.release()
+            for mm in self._maps:
+                mm.close()
+            self._views = []
+            self._maps = []
+            self.count = 0
+
+    # ------------------------------------------------------------------
+    # Keys
+
+    def _exact_key(self, text, dest_lang):
+        key = "{}\0{}".format(normalize_lang(dest_lang), normalize_text(text))
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'little')
+
+    def _gram_buckets(self, text, dest_lang):
+        """Trigram buckets of text, namespaced by target language"""
+        norm = ' {} '.format(normalize_text(text).lower())
+        prefix = normalize_lang(dest_lang) + '\0'
+        return set(
+            zlib.crc32((prefix + norm[i:i + GRAM_SIZE]).encode('utf-8')) & (GRAM_BUCKETS - 1)
+            for i in range(len(norm) - GRAM_SIZE + 1)
+        )
+
+    def _segment(self, seg_id):
+        start = self._offsets[seg_id]
+        end = self._offsets[seg_id + 1] if seg_id + 1 < self.count else len(self._store)
+        return json.loads(self._store[start:end].decode('utf-8'))
+
+    # ------------------------------------------------------------------
+    # Lookup
+
+    def lookup(self, text, src='auto', dest='en', min_score=None):
+        """Return the best TMMatch for text, or None"""
+        if min_score is None:
+            min_score = self.fuzzy_threshold
+
+        with self._lock:
+            if not self.count or not text or not text.strip():
+                return None
+
+            match = self._lookup_exact(text, src, dest)
+            if match is None and min_score < 1.0:
+                match = self._lookup_fuzzy(text, src, dest, min_score)
+            return match
+
+    def _lang_matches(self, segment, src, dest):
+        if segment['to_lang'] != normalize_lang(dest):
+            return False
+        return src == 'auto' or segment['from_lang'] == normalize_lang(src)
+
+    def _lookup_exact(self, text, src, dest):
+        key = self._exact_key(text, dest)
+        norm = normalize_text(text)
+        # Walk equal keys right to left so the most recently imported wins
+        i = bisect.bisect_right(self._exact_keys, key) - 1
+        while i >= 0 and self._exact_keys[i] == key:
+            segment = self._segment(self._exact_ids[i])
+            if normalize_text(segment['original']) == norm and self._lang_matches(segment, src, dest):
+                return TMMatch(segment['original'], segment['translated'],
+                               segment['from_lang'], segment['to_lang'], 1.0)
+            i -= 1
+        return None
+
+    def _lookup_fuzzy(self, text, src, dest, min_score):
+        buckets = self._gram_buckets(text, dest)
+        if not buckets:
+            return None
+
+        # Prefix filter: a segment sharing >= min_score of the query's
+        # trigrams must appear in one of the (n - needed + 1) rarest lists
+        lists = []
+        for b in buckets:
+            start, end = self._gram_dir[b], self._gram_dir[b + 1]
+            if end > start:
+                lists.append((end - start, start, end))
+        lists.sort()
+        needed = max(1, int(len(buckets) * min_score))
+        lists = lists[:len(buckets) - needed + 1]
+
+        candidates = Counter()
+        for size, start, end in lists:
+            if size > self.max_postings:
+                break
+            candidates.update(self._postings[start:end])
+
+        # seq2 is cached by SequenceMatcher, so the query goes there
+        matcher = difflib.SequenceMatcher(None)
+        matcher.set_seq2(normalize_text(text).lower())
+        best = None
+        best_score = min_score
+        for seg_id, hits in candidates.most_common(self.max_candidates):
+            segment = self._segment(seg_id)
+            if not self._lang_matches(segment, src, dest):
+                continue
+            matcher.set_seq1(normalize_text(segment['original']).lower())
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score >= best_score:
+                best = TMMatch(segment['original'], segment['translated'],
+                               segment['from_lang'], segment['to_lang'], score)
+                best_score = score
+        return best
+
+    # ------------------------------------------------------------------
+    # Import / export
+
+    def import_file(self, path, src_lang=None, dest_lang=None, progress_callback=None):
+        """
+        Import a .tmx or .jsonl file and rebuild the index
+
+        src_lang/dest_lang filter TMX language pairs (default: every pair
+        from the TMX source language). Segments already in the memory are
+        skipped here, segments repeated in the file are dropped while the
+        index is rebuilt. Returns the number of new segments.
+
+        The store is copied and every index rebuilt, so an import takes
+        time proportional to the whole memory, not just the imported file.
+        """
+        if path.lower().endswith('.tmx'):
+            segments = iter_tmx(path, src_lang, dest_lang)
+        else:
+            segments = iter_jsonl(path)
+
+        # One import at a time, each builds in its own temporary directory
+        with self._import_lock:
+            os.makedirs(self.tm_dir, exist_ok=True)
+            build_dir = tempfile.mkdtemp(prefix='import.', dir=self.tm_dir)
+            try:
+                store_tmp = os.path.join(build_dir, 'segments.jsonl')
+                if os.path.exists(self._path('segments.jsonl')):
+                    shutil.copyfile(self._path('segments.jsonl'), store_tmp)
+                else:
+                    open(store_tmp, 'wb').close()
+
+                imported = 0
+                with open(store_tmp, 'a', encoding='utf-8') as f:
+                    for segment in segments:
+                        if self._contains(segment):
+                            continue
+                        f.write(json.dumps(segment, ensure_ascii=False) + '\n')
+                        imported += 1
+                        if progress_callback and imported % 10000 == 0:
+                            progress_callback('import', imported)
+
+                if imported:
+                    imported -= self._rebuild(build_dir, progress_callback)
+                return imported
+            finally:
+                shutil.rmtree(build_dir, ignore_errors=True)
+
+    def _segment_digest(self, segment):
+        """Identity of a segment: exact key, source language and translation"""
+        key = json.dumps([normalize_lang(segment['to_lang']), normalize_text(segment['original']),
+                          segment['from_lang'], segment['translated']], ensure_ascii=False)
+        return hashlib.md5(key.encode('utf-8')).digest()
+
+    def _contains(self, segment):
+        """Check if the indexed memory already has this segment"""
+        with self._lock:
+            if not self.count:
+                return False
+            key = self._exact_key(segment['original'], segment['to_lang'])
+            norm = normalize_text(segment['original'])
+            i = bisect.bisect_right(self._exact_keys, key) - 1
+            while i >= 0 and self._exact_keys[i] == key:
+                stored = self._segment(self._exact_ids[i])
+                if (normalize_text(stored['original']) == norm
+                        and stored['from_lang'] == segment['from_lang']
+                        and stored['translated'] == segment['translated']):
+                    return True
+                i -= 1
+            return False
+
+    def _iter_store(self, store_path):
+        """Yield (offset, segment) from a JSONL store"""
+        with open(store_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                yield offset, json.loads(line.decode('utf-8'))
+                offset += len(line)
+
+    def _rebuild(self, build_dir, progress_callback=None):
+        """
+        Build all index files for build_dir/segments.jsonl and swap them in
+
+        Returns the number of duplicate segments dropped from the store.
+        """
+        tmp = lambda name: os.path.join(build_dir, name)
+        store_tmp = tmp('segments.jsonl')
+
+        # Pass 1: offsets, exact keys and trigram bucket sizes
+        offsets = array.array('Q')
+        keys = array.array('Q')
+        counts = array.array('Q', [0]) * GRAM_BUCKETS
+        for offset, segment in self._iter_store(store_tmp):
+            offsets.append(offset)
+            keys.append(self._exact_key(segment['original'], segment['to_lang']))
+            for b in self._gram_buckets(segment['original'], segment['to_lang']):
+                counts[b] += 1
+            if progress_callback and len(offsets) % 10000 == 0:
+                progress_callback('index', len(offsets))
+
+        self._sort_exact(keys, build_dir)
+        del keys
+
+        offsets, dropped = self._dedupe(build_dir, offsets, counts)
+        count = len(offsets)
+        with open(tmp('offsets.bin'), 'wb') as f:
+            offsets.tofile(f)
+        del offsets
+
+        gram_dir = array.array('Q', [0]) * (GRAM_BUCKETS + 1)
+        for b in range(GRAM_BUCKETS):
+            gram_dir[b + 1] = gram_dir[b] + counts[b]
+        with open(tmp('grams.dir'), 'wb') as f:
+            gram_dir.tofile(f)
+
+        # Pass 2: fill postings in place (counting sort, no per-posting objects)
+        total = gram_dir[GRAM_BUCKETS]
+        cursor = gram_dir[:-1]
+        with open(tmp('grams.bin'), 'w+b') as f:
+            f.truncate(max(total, 1) * 4)
+            mm = mmap.mmap(f.fileno(), 0)
+            postings = memoryview(mm).cast('I')
+            for seg_id, (offset, segment) in enumerate(self._iter_store(store_tmp)):
+                for b in self._gram_buckets(segment['original'], segment['to_lang']):
+                    postings[cursor[b]] = seg_id
+                    cursor[b] += 1
+            postings.release()
+            mm.close()
+
+        meta = {'version': INDEX_VERSION, 'count': count, 'byteorder': sys.byteorder}
+        with open(tmp('meta.json'), 'w', encoding='utf-8') as f:
+            f.write(json.dumps(meta))
+
+        # Maps must be closed before replacing mapped files (Windows)
+        with self._lock:
+            self.close()
+            for name in ('offsets.bin', 'exact.bin', 'exact.ids', 'grams.dir', 'grams.bin',
+                         'segments.jsonl', 'meta.json'):
+                os.replace(tmp(name), self._path(name))
+            self._open()
+        return dropped
+
+    def _sort_exact(self, keys, build_dir):
+        """
+        Write exact.bin/exact.ids sorted by key (ties by segment id)
+
+        Sorting needs Python ints, so it runs over at most SORT_RUN ids at a
+        time and merges the sorted runs from disk. Besides the flat keys
+        array (8 bytes per segment), memory stays bounded by one run.
+        """
+        runs = []
+        for lo in range(0, len(keys), SORT_RUN):
+            order = sorted(range(lo, min(lo + SORT_RUN, len(keys))), key=keys.__getitem__)
+            run = os.path.join(build_dir, 'run{}'.format(len(runs)))
+            with open(run + '.keys', 'wb') as f:
+                array.array('Q', (keys[i] for i in order)).tofile(f)
+            with open(run + '.ids', 'wb') as f:
+                array.array('I', order).tofile(f)
+            runs.append(run)
+            del order
+
+        if len(runs) == 1:
+            os.replace(runs[0] + '.keys', os.path.join(build_dir, 'exact.bin'))
+            os.replace(runs[0] + '.ids', os.path.join(build_dir, 'exact.ids'))
+            return
+
+        _write_pairs(heapq.merge(*[_iter_pairs(run + '.keys', run + '.ids') for run in runs]),
+                     os.path.join(build_dir, 'exact.bin'), os.path.join(build_dir, 'exact.ids'))
+
+        for run in runs:
+            os.remove(run + '.keys')
+            os.remove(run + '.ids')
+
+    def _dedupe(self, build_dir, offsets, counts):
+        """
+        Drop segments repeated in the store, keeping the first occurrence
+
+        Duplicates share an exact key, so they are adjacent in the sorted
+        exact index and only one key group is held in memory at a time.
+        The store, exact index and trigram counts are rewritten without
+        them. Returns (offsets, dropped).
+        """
+        tmp = lambda name: os.path.join(build_dir, name)
+        count = len(offsets)
+        mm = _open_mapped(tmp('segments.jsonl'))
+        if mm is None:
+            return offsets, 0
+
+        def line(seg_id):
+            end = offsets[seg_id + 1] if seg_id + 1 < count else len(mm)
+            return mm[offsets[seg_id]:end]
+
+        dup = bytearray(count)
+        dropped = 0
+        try:
+            pairs = _iter_pairs(tmp('exact.bin'), tmp('exact.ids'))
+            for key, group in itertools.groupby(pairs, key=lambda pair: pair[0]):
+                group = [seg_id for key, seg_id in group]
+                if len(group) < 2:
+                    continue
+                seen = set()
+                for seg_id in group:
+                    digest = self._segment_digest(json.loads(line(seg_id).decode('utf-8')))
+                    if digest in seen:
+                        dup[seg_id] = 1
+                        dropped += 1
+                    else:
+                        seen.add(digest)
+            if not dropped:
+                return offsets, 0
+
+            # New id of every kept segment
+            remap = array.array('I', [0]) * count
+            new_id = 0
+            for seg_id in range(count):
+                remap[seg_id] = new_id
+                new_id += not dup[seg_id]
+
+            new_offsets = array.array('Q')
+            with open(tmp('segments.new'), 'wb') as f:
+                for seg_id in range(count):
+                    data = line(seg_id)
+                    if dup[seg_id]:
+                        segment = json.loads(data.decode('utf-8'))
+                        for b in self._gram_buckets(segment['original'], segment['to_lang']):
+                            counts[b] -= 1
+                    else:
+                        new_offsets.append(f.tell())
+                        f.write(data)
+        finally:
+            mm.close()
+
+        pairs = ((key, remap[seg_id])
+                 for key, seg_id in _iter_pairs(tmp('exact.bin'), tmp('exact.ids'))
+                 if not dup[seg_id])
+        _write_pairs(pairs, tmp('exact.new'), tmp('ids.new'))
+        os.replace(tmp('exact.new'), tmp('exact.bin'))
+        os.replace(tmp('ids.new'), tmp('exact.ids'))
+        os.replace(tmp('segments.new'), tmp('segments.jsonl'))
+        return new_offsets, dropped
+
+    def export_file(self, path):
+        """Export all segments to a .tmx or .jsonl file, returns the count"""
+        store = self._path('segments.jsonl')
+        if not os.path.exists(store):
+            return 0
+
+        segments = (segment for offset, segment in self._iter_store(store))
+        if path.lower().endswith('.tmx'):
+            return write_tmx(path, segments)
+        return write_jsonl(path, segments)
+
+    def clear(self):
+        """Delete the translation memory"""
+        with self._lock:
+            self.close()
+            if os.path.isdir(self.tm_dir):
+                shutil.rmtree(self.tm_dir, ignore_errors=True)
+                return True
+            return False
+
+
+# ----------------------------------------------------------------------
+# Streaming readers and writers
+
+def _write_pairs(pairs, keys_path, ids_path):
+    """Write (key, segment id) pairs as parallel uint64/uint32 files, SORT_BLOCK at a time"""
+    out_keys = array.array('Q')
+    out_ids = array.array('I')
+    with open(keys_path, 'wb') as fk, open(ids_path, 'wb') as fi:
+        for key, seg_id in pairs:
+            out_keys.append(key)
+            out_ids.append(seg_id)
+            if len(out_keys) >= SORT_BLOCK:
+                out_keys.tofile(fk)
+                out_ids.tofile(fi)
+                out_keys = array.array('Q')
+                out_ids = array.array('I')
+        out_keys.tofile(fk)
+        out_ids.tofile(fi)
+
+
+def _iter_pairs(keys_path, ids_path):
+    """Yield (key, segment id) from parallel key/id files, SORT_BLOCK entries at a time"""
+    with open(keys_path, 'rb') as fk, open(ids_path, 'rb') as fi:
+        while True:
+            keys = array.array('Q')
+            ids = array.array('I')
+            try:
+                keys.fromfile(fk, SORT_BLOCK)
+            except EOFError:
+                pass  # Partial last block is still read
+            try:
+                ids.fromfile(fi, SORT_BLOCK)
+            except EOFError:
+                pass
+            if not keys:
+                return
+            for pair in zip(keys, ids):
+                yield pair
+
+
+def _open_mapped(path):
+    """mmap a file for streaming parsers, None if it is empty"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _make_segment(original, translated, from_lang, to_lang):
+    return {
+        'from_lang': normalize_lang(from_lang),
+        'to_lang': normalize_lang(to_lang),
+        'original': original,
+        'translated': translated
+    }
+
+
+def iter_jsonl(path):
+    """
+    Stream segments from a JSONL file
+
+    Accepts history-style keys (original/translated/from_lang/to_lang)
+    or source/target/src_lang/dest_lang.
+    """
+    mm = _open_mapped(path)
+    if mm is None:
+        return
+    try:
+        for line in iter(mm.readline, b''):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line.decode('utf-8'))
+            original = entry.get('original', entry.get('source'))
+            translated = entry.get('translated', entry.get('target'))
+            if original and translated:
+                yield _make_segment(
+                    original, translated,
+                    entry.get('from_lang', entry.get('src_lang')),
+                    entry.get('to_lang', entry.get('dest_lang')))
+    finally:
+        mm.close()
+
+
+def _seg_text(seg):
+    """Plain text of a TMX seg, without inline native codes"""
+    parts = [seg.text or '']
+    for child in seg:
+        if child.tag not in ('bpt', 'ept', 'ph', 'it', 'ut'):
+            parts.append(_seg_text(child))
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+
+def _tuv_lang(tuv):
+    return tuv.get(XML_LANG) or tuv.get('lang')
+
+
+def iter_tmx(path, src_lang=None, dest_lang=None):
+    """Stream segments from a TMX file, one per source/target tuv pair"""
+    mm = _open_mapped(path)
+    if mm is None:
+        return
+    try:
+        header_src = None
+        body = None
+        for event, elem in ElementTree.iterparse(mm, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == 'body':
+                    body = elem
+                continue
+            if elem.tag == 'header':
+                header_src = elem.get('srclang')
+                continue
+            if elem.tag != 'tu':
+                continue
+
+            variants = []
+            for tuv in elem.iter('tuv'):
+                seg = tuv.find('seg')
+                if seg is not None:
+                    text = _seg_text(seg).strip()
+                    if text:
+                        variants.append((normalize_lang(_tuv_lang(tuv)), text))
+
+            tu_src = elem.get('srclang') or header_src
+            if src_lang:
+                tu_src = src_lang
+            if not tu_src or tu_src == '*all*':
+                tu_src = variants[0][0] if variants else None
+            tu_src = normalize_lang(tu_src)
+
+            sources = [text for lang, text in variants if lang == tu_src]
+            if sources:
+                for lang, text in variants:
+                    if lang != tu_src and (not dest_lang or lang == normalize_lang(dest_lang)):
+                        yield _make_segment(sources[0], text, tu_src, lang)
+
+            # Drop parsed units, keeps memory flat on huge files
+            elem.clear()
+            if body is not None:
+                body.clear()
+    finally:
+        mm.close()
+
+
+def write_jsonl(path, segments):
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for segment in segments:
+            f.write(json.dumps(segment, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def write_tmx(path, segments):
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<tmx version="1.4">\n')
+        f.write('  <header creationtool="Transpy" creationtoolversion="1.0" '
+                'segtype="sentence" o-tmf="Transpy" adminlang="en" srclang="*all*" datatype="plaintext"/>\n')
+        f.write('  <body>\n')
+        for segment in segments:
+            f.write('    <tu srclang={}>\n'.format(quoteattr(segment['from_lang'])))
+            for lang, text in ((segment['from_lang'], segment['original']),
+                               (segment['to_lang'], segment['translated'])):
+                f.write('      <tuv xml:lang={}><seg>{}</seg></tuv>\n'.format(
+                    quoteattr(lang), escape(text)))
+            f.write('    </tu>\n')
+            count += 1
+        f.write('  </body>\n</tmx>\n')
+    return count
+
+
+# Test function
+if __name__ == "__main__":
+    import tempfile
+
+    tm_dir = tempfile.mkdtemp()
+    sample = os.path.join(tm_dir, 'sample.jsonl')
+    write_jsonl(sample, [
+        _make_segment("Hello world", "Halo dunia", "en", "id"),
+        _make_segment("Good morning everyone", "Selamat pagi semuanya", "en", "id"),
+    ])
+
+    tm = TranslationMemory(os.path.join(tm_dir, 'tm'))
+    print("Import test: {} segments".format(tm.import_file(sample)))
+
+    match = tm.lookup("Hello world", "auto", "id")
+    print("Exact lookup test: {}".format(match.translated if match else None))
+
+    match = tm.lookup("Good morning, everyone!", "en", "id")
+    print("Fuzzy lookup test: {} ({:.2f})".format(
+        match.translated if match else None, match.score if match else 0.0))
+
+    tm.close()
+    shutil.rmtree(tm_dir)